@@ -1,14 +1,23 @@
 """TCP client."""
-from pathlib import Path
+from contextlib import ExitStack, contextmanager
 import socket
 import tarfile
-import tempfile
+from typing import BinaryIO, Iterator, Optional
 import zipfile
 
 import py7zr
+from py7zr.io import BytesIOFactory
 from pydantic import BaseModel, ConfigDict, Field, FilePath, IPvAnyAddress
 
 
+# Maximum number of bytes read from the socket at once
+RECV_BUFFER_SIZE = 1 << 16
+# Maximum number of bytes read from an archive and sent to the socket at once
+COPY_BUFFER_SIZE = 1 << 16
+# Size of the output file buffer, in bytes
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
 class ArithmeticClient(BaseModel):
     """
     TCP client responsible for sending arithmetic operations to the server and receiving computed results.
@@ -41,44 +50,60 @@ class ArithmeticClient(BaseModel):
         :return: None
         :raises ValueError: If the archive format is unsupported or contains no .txt file
         """
-        # Load expressions from file or archive
-        if input_file.suffix == ".txt":
-            # Plain text file: read directly
-            content = input_file.read_text()
-        else:
-            # Archive file: extract the first text file found
-            content = self._extract_archive(input_file)
+        # The input archive and the socket are closed together once results are received
+        with ExitStack() as stack:
+            # Open the archive before connecting, so errors on the archive are raised early
+            # Content is kept as bytes: it is sent as-is, without being decoded then encoded again
+            member: Optional[BinaryIO] = None
+            if input_file.suffix != ".txt":
+                # Archive file: open the first text file found
+                member = stack.enter_context(self._open_archive(input_file))
 
-        # Open a TCP socket to the server
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            # Open a TCP socket to the server
+            s: socket.socket = stack.enter_context(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
             # Establish connection
             s.connect((self.host, self.port))
             # Send all expressions to the server
-            s.sendall(content.encode())
+            if member is None:
+                # Plain text file: sendfile() copies it from the page cache to the socket in the kernel,
+                # without loading it in memory
+                with input_file.open("rb") as f_in:
+                    s.sendfile(f_in)
+            else:
+                # Archive file: stream the text file to the socket as it is read from the archive
+                while chunk := member.read(COPY_BUFFER_SIZE):
+                    s.sendall(chunk)
             # Signal that no more data will be sent
             s.shutdown(socket.SHUT_WR)
             
             # Receive computed results from the server
-            with output_file.open("w", encoding="utf-8") as f_out:
+            # A single buffer is allocated and reused for every chunk: recv_into() fills it in place
+            # instead of allocating a new bytes object per chunk
+            buffer: bytearray = bytearray(RECV_BUFFER_SIZE)
+            view: memoryview = memoryview(buffer)
+            # Results are written as bytes, so a UTF-8 character split across two chunks is never decoded on its own
+            # The output file is flushed once, when closed, rather than after every chunk
+            with output_file.open("wb", buffering=OUTPUT_BUFFER_SIZE) as f_out:
                 while True:
-                    # Read up to 4096 bytes from the socket
-                    # recv() returns:
-                    # - a non-empty bytes object when data is available
-                    # - an empty bytes object (b"") when the peer has closed the connection
+                    # Read up to RECV_BUFFER_SIZE bytes from the socket into the buffer
+                    # recv_into() returns:
+                    # - the number of bytes received when data is available
+                    # - 0 when the peer has closed the connection
                     # Note: chunks are small pieces of data read from a TCP stream, as data may arrive in multiple packets
-                    chunk = s.recv(4096)
+                    nbytes: int = s.recv_into(view)
                     # No more data means the server finished sending the response
-                    if not chunk:
+                    if not nbytes:
                         break
-                    # Decode the received bytes chunk into a UTF-8 string and append it to the output file
-                    # Flushing forces the data to be written to disk immediately, ensuring progress is not lost
-                    # if the process is interrupted (e.g. KeyboardInterrupt or crash)
-                    f_out.write(chunk.decode())
-                    f_out.flush()
+                    # Append the received bytes to the output file
+                    f_out.write(view[:nbytes])
 
-    def _extract_archive(self, archive_path: FilePath) -> str:
+    @contextmanager
+    def _open_archive(self, archive_path: FilePath) -> Iterator[BinaryIO]:
         """
-        Extract the first .txt file found in a supported archive and return its content as a string.
+        Open the first .txt file found in a supported archive as a binary stream.
+
+        The file is read straight from the archive instead of being extracted to a temporary directory
+        and read back from disk. 7z archives cannot be read as a stream, so their .txt file is decompressed in memory.
 
         Supported formats:
         - .zip
@@ -86,37 +111,40 @@ class ArithmeticClient(BaseModel):
         - .7z
 
         :param FilePath archive_path: Path to the archive file
-        
-        :return: Content of the extracted .txt file
-        :rtype: str
+
+        :return: Binary stream over the content of the .txt file
+        :rtype: Iterator[BinaryIO]
         :raises ValueError: If no .txt file is found or format is unsupported
         """
-        # Create a temporary directory for safe extraction
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            if archive_path.suffix == ".zip":
-                with zipfile.ZipFile(archive_path, "r") as zf:
-                    txt_files = [f for f in zf.namelist() if f.endswith(".txt")]
-                    if not txt_files:
-                        raise ValueError("📄❌ No .txt file found in zip archive")
-                    zf.extract(txt_files[0], path=tmpdir_path)
-                    return (tmpdir_path / txt_files[0]).read_text()
-
-            elif archive_path.suffixes[-2:] == [".tar", ".xz"] or archive_path.suffix == ".tar.xz":
-                with tarfile.open(archive_path, "r:xz") as tf:
-                    txt_files = [m for m in tf.getmembers() if m.name.endswith(".txt")]
-                    if not txt_files:
-                        raise ValueError("📄❌ No .txt file found in tar.xz archive")
-                    tf.extract(txt_files[0], path=tmpdir_path, filter="data")
-                    return (tmpdir_path / txt_files[0].name).read_text()
-
-            elif archive_path.suffix == ".7z":
-                with py7zr.SevenZipFile(archive_path, mode="r") as archive:
-                    txt_files = [f for f in archive.getnames() if f.endswith(".txt")]
-                    if not txt_files:
-                        raise ValueError("📄❌ No .txt file found in 7z archive")
-                    archive.extract(targets=[txt_files[0]], path=tmpdir_path)
-                    return (tmpdir_path / txt_files[0]).read_text()
+        if archive_path.suffix == ".zip":
+            with zipfile.ZipFile(archive_path, "r") as zf:
+                txt_files = [f for f in zf.namelist() if f.endswith(".txt")]
+                if not txt_files:
+                    raise ValueError("📄❌ No .txt file found in zip archive")
+                with zf.open(txt_files[0]) as member:
+                    yield member
 
-            else:
-                raise ValueError(f"📄❌ Unsupported archive format: {archive_path.suffix}")
+        elif archive_path.suffixes[-2:] == [".tar", ".xz"] or archive_path.suffix == ".tar.xz":
+            with tarfile.open(archive_path, "r:xz") as tf:
+                # Stop at the first .txt file: listing all members with getmembers() would decompress
+                # the whole archive, then decompress it again from the start to read the file
+                txt_file = next((m for m in tf if m.isfile() and m.name.endswith(".txt")), None)
+                if txt_file is None:
+                    raise ValueError("📄❌ No .txt file found in tar.xz archive")
+                with tf.extractfile(txt_file) as member:
+                    yield member
+
+        elif archive_path.suffix == ".7z":
+            with py7zr.SevenZipFile(archive_path, mode="r") as archive:
+                txt_files = [f for f in archive.getnames() if f.endswith(".txt")]
+                if not txt_files:
+                    raise ValueError("📄❌ No .txt file found in 7z archive")
+                # Decompress into memory, the buffer limit being the size of the file
+                factory = BytesIOFactory(limit=archive.getinfo(txt_files[0]).uncompressed)
+                archive.extract(targets=[txt_files[0]], factory=factory)
+                member = factory.get(txt_files[0])
+                member.seek(0)
+                yield member
+
+        else:
+            raise ValueError(f"📄❌ Unsupported archive format: {archive_path.suffix}")
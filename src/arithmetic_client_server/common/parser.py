@@ -1,5 +1,6 @@
 """Parse and evaluate arithmetic operations safely."""
 from collections.abc import Callable as ABCCallable
+from functools import lru_cache
 import operator
 from typing import Callable, List, Tuple
 
@@ -15,6 +16,13 @@ OPERATORS: dict[str, Tuple[int, OperatorFn]] = {
     "/": (2, operator.truediv),
 }
 
+# Flat lookup tables derived from OPERATORS, used in evaluation loops to avoid indexing (precedence, function) tuples
+PRECEDENCES: dict[str, int] = {symbol: prec for symbol, (prec, _) in OPERATORS.items()}
+FUNCTIONS: dict[str, OperatorFn] = {symbol: fn for symbol, (_, fn) in OPERATORS.items()}
+
+# Maximum number of evaluated expressions kept in cache, in each process
+CACHE_SIZE: int = 4096
+
 
 class ExpressionParser:
     """
@@ -26,11 +34,11 @@ class ExpressionParser:
 
     Algorithm:
         1. Tokenize based on whitespace
-        2. Convert to Reverse Polish Notation (RPN) using Shunting-yard
-        3. Evaluate RPN using a stack
+        2. Evaluate in a single pass using an operand stack and an operator stack
 
-    The Shunting-yard algorithm converts an infix expression into Reverse Polish Notation (RPN), allowing safe, stack-based evaluation without parentheses.
-    It handles operator precedence by temporarily storing operators on a stack and outputting them in the correct order.
+    The evaluation follows the Shunting-yard algorithm, which handles operator precedence by temporarily storing
+    operators on a stack, but applies each operator as soon as it would be output in Reverse Polish Notation (RPN),
+    instead of building the RPN expression first. to_rpn() exposes the equivalent RPN conversion.
 
     Examples:
         - Infix expression (standard notation): 3 + 4 * 2
@@ -53,24 +61,6 @@ class ExpressionParser:
         # Simply split by whitespace
         return expr.split()
 
-    @staticmethod
-    def _is_number(token: str) -> bool:
-        """
-        Determine if a token represents a numeric value.
-
-        Supports both integers and floating-point numbers.
-
-        :param str token: Token string
-
-        :return: True if token can be converted to float, else False
-        :rtype: bool
-        """
-        try:
-            float(token)
-            return True
-        except ValueError:
-            return False
-
     @staticmethod
     def to_rpn(tokens: List[str]) -> List[str]:
         """
@@ -83,17 +73,19 @@ class ExpressionParser:
         """
         output: List[str] = []
         stack: List[str] = []
+        # Local alias: faster lookup than a global in the loop
+        precedences: dict[str, int] = PRECEDENCES
 
         for token in tokens:
-            if ExpressionParser._is_number(token):
-                # Numbers are added directly to the output
-                output.append(token)
-            else:
+            if token in precedences:
                 # Operator: pop operators from stack with higher or equal precedence
-                prec = OPERATORS[token][0]
-                while stack and OPERATORS.get(stack[-1], (0,))[0] >= prec:
+                prec = precedences[token]
+                while stack and precedences[stack[-1]] >= prec:
                     output.append(stack.pop())
                 stack.append(token)
+            else:
+                # Operands are added directly to the output, they are converted to numbers on evaluation
+                output.append(token)
 
         # Append remaining operators in reverse order (stack top first)
         output.extend(stack[::-1])
@@ -104,39 +96,69 @@ class ExpressionParser:
         """
         Evaluate an arithmetic expression safely.
 
+        Results are cached on the expression tokens, so an expression repeated in the input,
+        even with different spacing, is only parsed and evaluated once.
+        The cache is kept per process: each pool worker has its own cache, which lives as long as the worker,
+        so hits accumulate over all the batches the worker evaluates.
+
         :param str expr: Arithmetic expression string
 
         :return: Computed result as float
         :rtype: float
         :raises ValueError: If expression is invalid or malformed
         """
-        # Tokenize the expression
-        tokens: List[str] = ExpressionParser.tokenize(expr)
-        
+        # Tokenize the expression, tokens are the cache key
+        return ExpressionParser._evaluate_tokens(tuple(ExpressionParser.tokenize(expr)))
+
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _evaluate_tokens(tokens: Tuple[str, ...]) -> float:
+        """
+        Evaluate a tokenized arithmetic expression.
+
+        :param Tuple[str, ...] tokens: Tokens of the arithmetic expression
+
+        :return: Computed result as float
+        :rtype: float
+        :raises ValueError: If expression is invalid or malformed
+        """
         if not tokens:
             raise ValueError("Empty expression")
 
         # Check that the first and last tokens are not operators
         if tokens[0] in OPERATORS or tokens[-1] in OPERATORS:
-            raise ValueError(f"Expression cannot start or end with an operator: {expr}")
-
-        # Convert to RPN
-        rpn: List[str] = ExpressionParser.to_rpn(tokens)
-
-        # Evaluate RPN using a stack
-        stack: List[float] = []
-        for token in rpn:
-            if ExpressionParser._is_number(token):
-                stack.append(float(token))
+            raise ValueError(f"Expression cannot start or end with an operator: {' '.join(tokens)}")
+
+        # Evaluate in a single pass, applying operators as soon as their precedence allows it
+        # Operators are applied inline rather than through a helper, to avoid a function call per operator
+        values: List[float] = []
+        operators: List[str] = []
+        # Local aliases: faster lookups than globals in the loop
+        precedences: dict[str, int] = PRECEDENCES
+        functions: dict[str, OperatorFn] = FUNCTIONS
+        for token in tokens:
+            if token in precedences:
+                # Apply stacked operators with higher or equal precedence before stacking this one
+                prec = precedences[token]
+                while operators and precedences[operators[-1]] >= prec:
+                    # Operator requires two operands, the result replaces the first one
+                    if len(values) < 2:
+                        raise ValueError(f"Invalid expression (not enough operands): {' '.join(tokens)}")
+                    b: float = values.pop()
+                    values[-1] = functions[operators.pop()](values[-1], b)
+                operators.append(token)
             else:
-                # Operator requires two operands
-                if len(stack) < 2:
-                    raise ValueError(f"Invalid expression (not enough operands): {expr}")
-                b: float = stack.pop()
-                a: float = stack.pop()
-                stack.append(OPERATORS[token][1](a, b))
+                # Raises ValueError if the operand is not a number
+                values.append(float(token))
+
+        # Apply remaining operators in reverse order (stack top first)
+        while operators:
+            if len(values) < 2:
+                raise ValueError(f"Invalid expression (not enough operands): {' '.join(tokens)}")
+            b = values.pop()
+            values[-1] = functions[operators.pop()](values[-1], b)
 
-        if len(stack) != 1:
-            raise ValueError(f"Invalid expression (remaining operands): {expr}")
+        if len(values) != 1:
+            raise ValueError(f"Invalid expression (remaining operands): {' '.join(tokens)}")
 
-        return stack[0]
+        return values[0]
@@ -1,6 +1,7 @@
 """CLI to run the arithmetic client/server application."""
 import argparse
-from multiprocessing import Process
+from multiprocessing import Event, Process
+from multiprocessing.synchronize import Event as EventType
 from pathlib import Path
 import time
 
@@ -10,17 +11,25 @@ from arithmetic_client_server.client.client import ArithmeticClient
 from arithmetic_client_server.server.server import ArithmeticServer
 
 
+# Maximum number of seconds to wait for the server to listen before giving up
+SERVER_STARTUP_TIMEOUT = 10.0
+# Number of seconds between two checks that the server process is still alive, while waiting for it to listen
+SERVER_STARTUP_POLL_INTERVAL = 0.05
+
+
 class CliArgs(BaseModel):
     """
     Pydantic model used to validate CLI arguments.
 
     :param FilePath file_path: Path to the file containing arithmetic operations.
+    :param bool pin_workers: Pin each server worker process to its own CPU.
     """
 
     file_path: FilePath
+    pin_workers: bool = False
 
 
-def run_server(output_file: Path) -> None:
+def run_server(output_file: Path, ready: EventType, pin_workers: bool = False) -> None:
     """
     Start the arithmetic server.
 
@@ -28,11 +37,35 @@ def run_server(output_file: Path) -> None:
     It writes results to the specified output file.
 
     :param Path output_file: Path to write computation results
+    :param EventType ready: Event set by the server once it is listening
+    :param bool pin_workers: Pin each worker process to its own CPU
 
     :return: None
     """
-    server = ArithmeticServer(output_file=output_file)
-    server.start()
+    server = ArithmeticServer(output_file=output_file, pin_workers=pin_workers)
+    server.start(ready=ready)
+
+
+def wait_for_server(server_process: Process, ready: EventType, timeout: float = SERVER_STARTUP_TIMEOUT) -> None:
+    """
+    Wait until the server is listening.
+
+    The event is waited for in short slices, so that a server process which exits before listening
+    (e.g. because the port is already in use) is reported at once instead of after the whole timeout.
+
+    :param Process server_process: Process running the server
+    :param EventType ready: Event set by the server once it is listening
+    :param float timeout: Maximum number of seconds to wait
+
+    :return: None
+    :raises RuntimeError: If the server process exits or does not listen within the timeout
+    """
+    deadline: float = time.monotonic() + timeout
+    while not ready.wait(timeout=SERVER_STARTUP_POLL_INTERVAL):
+        if not server_process.is_alive():
+            raise RuntimeError(f"🖥️❌ Server exited with code {server_process.exitcode} before listening")
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"🖥️❌ Server did not start listening within {timeout} seconds")
 
 
 def parse_args() -> CliArgs:
@@ -51,10 +84,16 @@ def parse_args() -> CliArgs:
         help="Path to the file containing arithmetic operations",
     )
 
+    parser.add_argument(
+        "--pin-workers",
+        action="store_true",
+        help="Pin each server worker process to its own CPU",
+    )
+
     args = parser.parse_args()
 
     try:
-        return CliArgs(file_path=args.file_path)
+        return CliArgs(file_path=args.file_path, pin_workers=args.pin_workers)
     except ValidationError as exc:
         parser.error(str(exc))
 
@@ -92,7 +131,7 @@ def main() -> None:
         1. Parse CLI arguments and validate them using Pydantic.
         2. Build a safe output file path based on the input.
         3. Start the arithmetic server in a separate process.
-        4. Give the server time to start listening.
+        4. Wait until the server is listening.
         5. Launch the client to send the input file and receive results.
         6. Ensure server is properly terminated after client finishes.
 
@@ -103,13 +142,14 @@ def main() -> None:
     output_path: Path = build_output_path(input_path)
 
     # Start server in its own process
-    server_process: Process = Process(target=run_server, args=(output_path,))
+    ready: EventType = Event()
+    server_process: Process = Process(target=run_server, args=(output_path, ready, cli_args.pin_workers))
     server_process.start()
 
-    # Give the server time to start listening
-    time.sleep(1)
-
     try:
+        # Wait until the server is listening, instead of waiting for a fixed delay
+        wait_for_server(server_process, ready)
+
         # Launch client to send input file and retrieve results
         client: ArithmeticClient = ArithmeticClient()
         client.send_file(input_path, output_path)
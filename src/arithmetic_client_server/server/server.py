@@ -1,13 +1,48 @@
 """TCP server that evaluates arithmetic expressions using worker processes."""
-from multiprocessing import Pipe, Process, cpu_count
+from functools import lru_cache
+from itertools import chain, islice
+from multiprocessing import cpu_count, get_all_start_methods, get_context, get_start_method
+from multiprocessing.context import BaseContext
+from multiprocessing.synchronize import Event
+import os
 from pathlib import Path
 import socket
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from pydantic import BaseModel, ConfigDict, Field, IPvAnyAddress
+from pydantic import BaseModel, Field, IPvAnyAddress
 
 from arithmetic_client_server.common.logger import logger
-from arithmetic_client_server.server.worker import WorkerProcess
+from arithmetic_client_server.server.worker import evaluate_batch, pin_to_cpu
+
+
+# Default maximum number of bytes read from the socket at once
+RECV_BUFFER_SIZE = 1 << 16
+# Number of expressions per batch dispatched to the workers, large enough to amortize inter-process communication
+DISPATCH_BATCH_SIZE = 1000
+# Number of bytes of output lines accumulated before they are written to the output file and sent to the client
+WRITE_BATCH_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def _context() -> BaseContext:
+    """
+    Get the multiprocessing context used to start the worker processes.
+
+    Forking the server process is the cheapest way to start workers, where it is the default start method
+    (Linux before Python 3.14). Otherwise, workers are forked from a forkserver process which has already
+    imported the worker module, instead of being spawned as fresh interpreters which all import it again.
+    The context is resolved when the first pool is created, and the default start method is read without
+    being fixed, so the application can still choose its own start method.
+
+    :return: Multiprocessing context
+    :rtype: BaseContext
+    """
+    start_method: str = get_start_method(allow_none=True) or get_all_start_methods()[0]
+    if start_method == "fork" or "forkserver" not in get_all_start_methods():
+        return get_context(start_method)
+    context: BaseContext = get_context("forkserver")
+    context.set_forkserver_preload(["arithmetic_client_server.server.worker"])
+    return context
 
 
 class ArithmeticServer(BaseModel):
@@ -15,94 +50,205 @@ class ArithmeticServer(BaseModel):
     TCP socket server handling arithmetic expressions from clients.
 
     Features:
-        - Spawns one worker process per expression.
-        - Writes results immediately to disk as soon as a worker finishes.
-        - Ensures each worker is destroyed immediately after finishing.
+        - Evaluates expressions in a pool of worker processes, created once per client.
+        - Evaluates small batches of expressions in the server process, where starting workers would cost more.
+        - Dispatches expressions to the workers by batches to amortize inter-process communication,
+          as soon as they are received.
+        - Writes results to disk and sends them to the client by batches as workers return them.
         - Handles multiple simultaneous workers up to CPU core count.
     """
 
-    # Allow arbitrary types like multiprocessing.Connection
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-
     host: IPvAnyAddress = Field(default="127.0.0.1", description="Server host address")
     port: int = Field(default=9000, ge=1, le=65535, description="Server TCP port")
     output_file: Path = Field(..., description="Path to write computation results")
+    parallel_threshold: int = Field(
+        default=2000,
+        ge=0,
+        description="Minimum number of expressions for the evaluation to be dispatched to worker processes",
+    )
+    recv_buffer_size: int = Field(
+        default=RECV_BUFFER_SIZE,
+        ge=1 << 10,
+        le=1 << 20,
+        description="Maximum number of bytes read from the client socket at once",
+    )
+    pin_workers: bool = Field(
+        default=False,
+        description="Pin each worker process to its own CPU, on platforms supporting CPU affinity",
+    )
 
-    def _receive_data(self, conn: socket.socket) -> List[str]:
+    def _receive_lines(self, conn: socket.socket) -> Iterator[str]:
         """
-        Receive all data from the client connection and return non-empty lines.
+        Receive data from the client connection and yield non-empty lines as soon as they are complete.
 
         :param socket.socket conn: Connected client socket
 
-        :return: List of non-empty expression lines
-        :rtype: List[str]
+        :return: Iterator over non-empty expression lines
+        :rtype: Iterator[str]
         """
         # Note: chunks are small pieces of data read from a TCP stream, as data may arrive in multiple packets
-        chunks: List[bytes] = []
-        while True:
-            chunk: bytes = conn.recv(4096)
-            if not chunk:
-                break
-            chunks.append(chunk)
-        data: List[str] = b"".join(chunks).decode().splitlines()
-        # Remove empty lines
-        return [line.strip() for line in data if line.strip()]
-
-    def _spawn_worker(self, expr: str, line_number: int) -> Tuple[Process, Pipe]:
-        """
-        Spawn a WorkerProcess for the given expression and return process and pipe.
-
-        :param str expr: Arithmetic expression
-        :param int line_number: Line number of expression in input
-
-        :return: Tuple of (Process, parent_pipe)
-        :rtype: Tuple[Process, Pipe]
-        """
-        parent_conn, child_conn = Pipe()
-        worker = WorkerProcess(conn=child_conn, expression=expr, line_number=line_number)
-        process = Process(target=worker.run)
-        process.start()
-        return process, parent_conn
-
-    def _collect_finished_workers(
-        self, active_workers: List[Tuple[Process, Pipe]], f_out
-    ) -> None:
-        """
-        Collect results from all finished workers and write them to the output file.
-
-        Finished workers are removed from the active_workers list.
-
-        :param list active_workers: List of tuples (Process, Pipe)
-        :param file f_out: Open file handle for writing results
-        """
-        # Iterate in reverse to safely remove finished workers while iterating
-        for i in reversed(range(len(active_workers))):
-            proc, pipe_conn = active_workers[i]
-            if not proc.is_alive():
-                # Receive payload from worker
-                payload = pipe_conn.recv()
-                pipe_conn.close()
-                proc.join()
-                active_workers.pop(i)
-
-                # Write output immediately
-                if "result" in payload:
-                    f_out.write(f"{payload['expression']} = {payload['result']}\n")
-                else:
-                    f_out.write(f"{payload['expression']} -> ERROR: {payload['error']}\n")
-                f_out.flush()
-
-    def start(self) -> None:
+        # Chunks are read into a single reusable buffer, and appended to the pending incomplete line
+        pending: bytearray = bytearray()
+        buffer: bytearray = bytearray(self.recv_buffer_size)
+        view: memoryview = memoryview(buffer)
+        while nbytes := conn.recv_into(view):
+            pending += view[:nbytes]
+            # Only decode up to the last line feed, which is never part of a multi-byte UTF-8 character
+            # Earlier bytes hold no line feed, so only the received ones are searched, which keeps receiving linear
+            end: int = pending.rfind(b"\n", len(pending) - nbytes) + 1
+            if end:
+                # Strip every line once and drop the empty ones in a single pass over the decoded lines
+                yield from filter(None, map(str.strip, pending[:end].decode().splitlines()))
+                del pending[:end]
+        yield from filter(None, map(str.strip, pending.decode().splitlines()))
+
+    @staticmethod
+    def _batches(lines: Iterable[str], batch_size: int) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Split the expressions into batches of consecutive lines, as they come in.
+
+        :param Iterable[str] lines: Expressions to evaluate
+        :param int batch_size: Number of expressions per batch
+
+        :return: Iterator over tuples of (line number of the first expression, expressions)
+        :rtype: Iterator[Tuple[int, List[str]]]
+        """
+        lines = iter(lines)
+        first_line_number: int = 1
+        while batch := list(islice(lines, batch_size)):
+            yield first_line_number, batch
+            first_line_number += len(batch)
+
+    def _evaluate(self, lines: Iterable[str]) -> Iterator[bytes]:
+        """
+        Evaluate the expressions by batches and yield the encoded output lines of each batch as it completes.
+
+        Evaluating an expression only takes a few microseconds, so below parallel_threshold expressions
+        (or with a single CPU) they are evaluated in the server process, which is cheaper than starting
+        worker processes and exchanging data with them.
+        Otherwise, batches are dispatched to the worker processes as soon as their lines are received,
+        so the evaluation overlaps with the reception of the rest of the expressions.
+
+        :param Iterable[str] lines: Expressions to evaluate, possibly still being received
+
+        :return: Iterator over the encoded output lines of each batch
+        :rtype: Iterator[bytes]
+        """
+        lines = iter(lines)
+        # Read up to parallel_threshold expressions to know whether starting worker processes is worth it
+        head: List[str] = list(islice(lines, self.parallel_threshold))
+        # Pinned workers are limited to the CPUs the server may run on, so that no two workers share a CPU
+        cpu_ids: Tuple[int, ...] = self._pinned_cpus()
+        max_workers: int = min(cpu_count(), len(cpu_ids)) if cpu_ids else cpu_count()
+
+        if max_workers <= 1 or len(head) < self.parallel_threshold:
+            logger.info("👷 Evaluating expressions in the server process as they are received")
+            # Expressions are counted as they go, instead of receiving all of them first
+            nb_expressions: int = 0
+            for batch in self._batches(chain(head, lines), DISPATCH_BATCH_SIZE):
+                nb_expressions += len(batch[1])
+                yield evaluate_batch(batch)
+            logger.info(f"👷 Evaluated {nb_expressions} expressions in the server process")
+            return
+
+        logger.info(f"👷 Evaluating expressions with {max_workers} worker processes as they are received")
+        # Worker processes are created once and reused for all batches
+        # The pool consumes the batches, hence receives the remaining lines, in its own task handler thread
+        with _context().Pool(processes=max_workers, **self._pinning(cpu_ids[:max_workers])) as pool:
+            yield from pool.imap_unordered(evaluate_batch, self._batches(chain(head, lines), DISPATCH_BATCH_SIZE))
+
+    def _pinned_cpus(self) -> Tuple[int, ...]:
+        """
+        Get the CPUs the worker processes are pinned to, if pin_workers is enabled.
+
+        CPUs are taken from the affinity of the server process, which honours taskset and cgroup restrictions.
+
+        :return: Sorted CPU identifiers, empty if workers are not pinned
+        :rtype: Tuple[int, ...]
+        """
+        if not self.pin_workers or not hasattr(os, "sched_setaffinity"):
+            return ()
+        return tuple(sorted(os.sched_getaffinity(0)))
+
+    @staticmethod
+    def _pinning(cpu_ids: Tuple[int, ...]) -> Dict[str, Any]:
+        """
+        Build the pool arguments pinning each worker process to its own CPU.
+
+        :param Tuple[int, ...] cpu_ids: CPU identifiers, one per worker process, empty if workers are not pinned
+
+        :return: Keyword arguments for multiprocessing.Pool
+        :rtype: Dict[str, Any]
+        """
+        if not cpu_ids:
+            return {}
+        logger.info(f"📌 Pinning {len(cpu_ids)} worker processes to CPUs")
+        # Workers take their CPU through a shared counter, which needs neither a pipe nor closing
+        return {"initializer": pin_to_cpu, "initargs": (cpu_ids, _context().Value("i", 0))}
+
+    def _write_batch(self, batch: List[bytes], f_out, conn: Optional[socket.socket]) -> bool:
+        """
+        Write a batch of output lines to the output file and send it to the client.
+
+        :param List[bytes] batch: Encoded output lines to write
+        :param file f_out: Open binary file handle for writing results
+        :param Optional[socket.socket] conn: Connected client socket, None if the client disconnected
+
+        :return: True if the client is still connected, else False
+        :rtype: bool
+        """
+        data: bytes = b"".join(batch)
+        f_out.write(data)
+        if conn is None:
+            return False
+        try:
+            conn.sendall(data)
+            return True
+        except OSError as exc:
+            logger.error(f"🔌❌ Client disconnected before receiving results: {exc}")
+            return False
+
+    def _write_results(self, results: Iterable[bytes], f_out, conn: socket.socket) -> None:
+        """
+        Write the results or errors of evaluated expressions to the output file and send them to the client by batches.
+
+        Output lines are accumulated and written once the batch reaches WRITE_BATCH_SIZE bytes,
+        instead of writing every line, which would cost a system call per expression.
+        Results are sent to the client as they are produced, so the output file never has to be read back.
+        If the client disconnects, results are still written to the output file.
+
+        :param Iterable[bytes] results: Encoded output lines returned by the workers, as they come in
+        :param file f_out: Open binary file handle for writing results
+        :param socket.socket conn: Connected client socket
+        """
+        batch: List[bytes] = []
+        batch_size: int = 0
+        client_connected: bool = True
+        for lines in results:
+            batch.append(lines)
+            batch_size += len(lines)
+            if batch_size >= WRITE_BATCH_SIZE:
+                client_connected = self._write_batch(batch, f_out, conn if client_connected else None)
+                batch.clear()
+                batch_size = 0
+        if batch:
+            client_connected = self._write_batch(batch, f_out, conn if client_connected else None)
+        if client_connected:
+            logger.info("✉️ Results sent to client")
+
+    def start(self, ready: Optional[Event] = None) -> None:
         """
         Start the TCP server, accept client connections, and process arithmetic expressions.
 
         Steps:
-            1. Bind and listen on the specified host and port.
+            1. Bind and listen on the specified host and port, then signal that the server is ready.
             2. Accept a single client connection.
-            3. Receive all expressions from the client.
-            4. Spawn worker processes for each expression, respecting max CPU cores.
-            5. Write results to output file immediately after worker finishes.
-            6. Send the final results back to the client.
+            3. Receive expressions from the client.
+            4. Evaluate expressions as they are received, in a pool of worker processes respecting max CPU cores
+               for large inputs.
+            5. Write results to output file and send them back to the client by batches as workers return them.
+
+        :param Optional[Event] ready: Event set once the server is listening, so clients can connect
 
         :return: None
         """
@@ -113,33 +259,18 @@ class ArithmeticServer(BaseModel):
             s.bind((self.host, self.port))
             s.listen()
             logger.info("🖥️ Server listening")
+            if ready is not None:
+                ready.set()
 
             # Accept a single client connection
             conn, _ = s.accept()
-            with conn, self.output_file.open("w", encoding="utf-8") as f_out:
-
-                # Receive all expressions from client
-                data: List[str] = self._receive_data(conn)
-
-                # Limit number of active workers to CPU cores or number of expressions
-                max_workers: int = min(cpu_count(), len(data))
-                active_workers: List[Tuple[Process, Pipe]] = []
-
-                for line_number, expr in enumerate(data, start=1):
-                    # Wait until a worker slot is available
-                    while len(active_workers) >= max_workers:
-                        self._collect_finished_workers(active_workers, f_out)
-
-                    # Spawn new worker for current expression
-                    active_workers.append(self._spawn_worker(expr, line_number))
-
-                # Collect remaining active workers
-                while active_workers:
-                    self._collect_finished_workers(active_workers, f_out)
+            # Results are sent by large batches, so there is no small write for Nagle's algorithm to coalesce,
+            # and disabling it avoids delaying the last partial segment until the client acknowledges the previous ones
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Batches are larger than the default file buffer, so each one is written straight to the
+            # file descriptor with a single write() call, without being copied into the buffer first
+            with conn, self.output_file.open("wb") as f_out:
 
-                # Send results back to client
-                try:
-                    conn.sendall(self.output_file.read_bytes())
-                    logger.info("✉️ Results sent to client")
-                except OSError as exc:
-                    logger.error(f"🔌❌ Client disconnected before receiving results: {exc}")
+                # Evaluate expressions as they are received from the client,
+                # then write output and send it back to client by batches as results come in
+                self._write_results(self._evaluate(self._receive_lines(conn)), f_out, conn)
@@ -1,80 +1,85 @@
-"""Worker process for evaluating arithmetic expressions."""
-from multiprocessing.connection import Connection
-from typing import Union
-
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+"""Worker functions for evaluating arithmetic expressions in a process pool."""
+from multiprocessing.sharedctypes import Synchronized
+import os
+from typing import Dict, List, Tuple, Union
 
 from arithmetic_client_server.common.logger import logger
 from arithmetic_client_server.common.parser import ExpressionParser
 
 
-class WorkerProcess(BaseModel):
+def evaluate_expression(task: Tuple[int, str]) -> Dict[str, Union[int, float, str]]:
+    """
+    Evaluate a single arithmetic expression and return the result or error as a payload.
+
+    :param Tuple[int, str] task: Tuple of (line number, arithmetic expression)
+
+    :return: Payload with the line number, the expression and either its result or an error message
+    :rtype: Dict[str, Union[int, float, str]]
+    """
+    line_number, expression = task
+
+    try:
+        # Evaluate expression safely
+        result: float = ExpressionParser.evaluate(expression)
+    except Exception as exc:
+        logger.error(
+            f"👷❌ Worker failed on line {line_number}: {exc}\n" \
+            f"Invalid arithmetic expression, could not evaluate: {expression!r}"
+        )
+        return {"line": line_number, "expression": expression, "error": str(exc)}
+
+    return {"line": line_number, "expression": expression, "result": result}
+
+
+def format_result(payload: Dict[str, Union[int, float, str]]) -> str:
+    """
+    Format the result or error of an evaluated expression as an output line.
+
+    :param dict payload: Payload returned by evaluate_expression
+
+    :return: Output line, terminated by a newline
+    :rtype: str
+    """
+    if "result" in payload:
+        return f"{payload['expression']} = {payload['result']}\n"
+    return f"{payload['expression']} -> ERROR: {payload['error']}\n"
+
+
+def evaluate_batch(task: Tuple[int, List[str]]) -> bytes:
     """
-    Worker process responsible for evaluating a single arithmetic expression.
+    Evaluate a batch of consecutive arithmetic expressions and return their encoded output lines.
+
+    This function is defined at module level so that it can be pickled and dispatched
+    to the worker processes of a multiprocessing.Pool, which are reused across all batches.
+    Formatting and encoding the output in the worker means a single bytes object is sent back
+    to the server per batch, instead of one payload per expression.
+
+    :param Tuple[int, List[str]] task: Tuple of (line number of the first expression, arithmetic expressions)
 
-    Lifecycle:
-        - Spawned by the parent server process
-        - Receives one expression only
-        - Sends the computed result or error through a Pipe
-        - Terminates immediately after computation
+    :return: Output lines of the batch, encoded in UTF-8
+    :rtype: bytes
     """
+    first_line_number, expressions = task
+    return "".join(
+        format_result(evaluate_expression(line_task))
+        for line_task in enumerate(expressions, start=first_line_number)
+    ).encode()
 
-    # Make the Pydantic instance immutable (read-only) for safety
-    # Allow arbitrary types like multiprocessing.Connection
-    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
-
-    conn: Connection = Field(..., description="Connection object for sending results back to server")
-    expression: str = Field(..., description="Single arithmetic expression to evaluate")
-    line_number: int = Field(..., ge=1, description="Line number in the input file")
-
-    @field_validator("expression")
-    def expression_must_not_be_empty(cls, v: str) -> str:
-        """Ensure that the expression is not empty."""
-        if not v.strip():
-            raise ValueError("Expression cannot be empty")
-        return v
-
-    def run(self) -> None:
-        """
-        Evaluate the arithmetic expression and send the result or error through the pipe.
-
-        :return: None
-        """
-        logger.info(f"👷🏁 Worker started on line {self.line_number}: {self.expression}")
-
-        result: Union[float, None] = None
-
-        try:
-            # Evaluate expression safely
-            result = ExpressionParser.evaluate(self.expression)
-
-            # Send result through the connection
-            self.conn.send(
-                {
-                    "line": self.line_number,
-                    "expression": self.expression,
-                    "result": result,
-                }
-            )
-
-        except Exception as exc:
-            logger.error(
-                f"👷❌ Worker failed on line {self.line_number}: {exc}\n" \
-                f"Invalid arithmetic expression, could not evaluate: {self.expression!r}"
-            )
-            
-            # Send error through the connection
-            self.conn.send(
-                {
-                    "line": self.line_number,
-                    "expression": self.expression,
-                    "error": str(exc),
-                }
-            )
-
-        finally:
-            # Always close the connection
-            self.conn.close()
-
-            if result is not None:
-                logger.info(f"👷✅ Worker finished on line {self.line_number}: {result}")
+
+def pin_to_cpu(cpu_ids: Tuple[int, ...], next_index: Synchronized) -> None:
+    """
+    Pin the current worker process to the next unused CPU.
+
+    This function is used as the initializer of the pool worker processes, so that every worker
+    takes a different CPU and is not migrated by the scheduler between CPUs (and their caches).
+    Workers started once all CPUs are taken, such as the replacement of a worker which died,
+    are not pinned, instead of waiting for a CPU to be released.
+
+    :param Tuple[int, ...] cpu_ids: CPU identifiers, one per worker process
+    :param Synchronized next_index: Shared index of the next unused CPU identifier
+    """
+    with next_index.get_lock():
+        index: int = next_index.value
+        next_index.value += 1
+    if index < len(cpu_ids):
+        os.sched_setaffinity(0, {cpu_ids[index]})
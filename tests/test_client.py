@@ -10,6 +10,49 @@ import pytest
 from arithmetic_client_server.client.client import ArithmeticClient
 
 
+class FakeSocket:
+    """Mock socket recording the data sent by the client and replying with a fixed response."""
+
+    def __init__(self, response: bytes = b""):
+        """Reply with response to the client."""
+        self.response = response
+        self.sent_data = b""
+        self.sendall_calls = 0
+        self.sendfile_calls = 0
+
+    def connect(self, addr) -> None:
+        """Pretend to connect to the server."""
+
+    def sendall(self, data: bytes) -> None:
+        """Record data sent in a single call."""
+        self.sendall_calls += 1
+        self.sent_data += data
+
+    def sendfile(self, file) -> None:
+        """Record the content of a file sent by the kernel."""
+        self.sendfile_calls += 1
+        self.sent_data += file.read()
+
+    def shutdown(self, how) -> None:
+        """Pretend to shut down the connection."""
+
+    def recv_into(self, buffer) -> int:
+        """Copy the next part of the response into buffer."""
+        data, self.response = self.response[: len(buffer)], self.response[len(buffer) :]
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        """Pretend to close the socket."""
+
+    def __enter__(self):
+        """Use the socket as a context manager."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Leave the socket context manager."""
+
+
 def test_client_valid_config() -> None:
     """Check that a valid host and port correctly initialize the client."""
     client = ArithmeticClient(host="127.0.0.1", port=9000)
@@ -29,50 +72,43 @@ def test_client_invalid_port() -> None:
         ArithmeticClient(host="127.0.0.1", port=70000)
 
 def test_send_file_txt(tmp_path, monkeypatch) -> None:
-    """Verify sending a plain text file writes expected results to output."""
+    """Verify sending a plain text file uses sendfile() and writes expected results to output."""
     input_file = tmp_path / "ops.txt"
     output_file = tmp_path / "results.txt"
 
     input_file.write_text("1+1\n2*2\n")
 
-    # Fake socket
-    class FakeSocket:
-        def __init__(self):
-            self.calls = 0
-
-        def connect(self, addr):
-            pass
-
-        def sendall(self, data):
-            assert b"1+1" in data
-
-        def shutdown(self, how):
-            pass
-
-        def recv(self, size):
-            self.calls += 1
-            if self.calls == 1:
-                return b"2\n4\n"
-            return b""
+    fake_socket = FakeSocket(response=b"2\n4\n")
+    monkeypatch.setattr(socket, "socket", lambda *a, **kw: fake_socket)
 
-        def close(self):
-            pass
+    client = ArithmeticClient()
+    client.send_file(input_file, output_file)
 
-        def __enter__(self):
-            return self
+    assert fake_socket.sent_data == b"1+1\n2*2\n"
+    assert fake_socket.sendfile_calls == 1
+    assert fake_socket.sendall_calls == 0
+    assert output_file.read_text() == "2\n4\n"
 
-        def __exit__(self, *args):
-            pass
+def test_send_file_archive(tmp_path, monkeypatch) -> None:
+    """Verify sending an archive sends the content of its text file to the server."""
+    txt = tmp_path / "ops.txt"
+    txt.write_text("3+3\n")
+    zip_path = tmp_path / "ops.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.write(txt, arcname="ops.txt")
+    output_file = tmp_path / "results.txt"
 
-    monkeypatch.setattr(socket, "socket", lambda *a, **kw: FakeSocket())
+    fake_socket = FakeSocket()
+    monkeypatch.setattr(socket, "socket", lambda *a, **kw: fake_socket)
 
     client = ArithmeticClient()
-    client.send_file(input_file, output_file)
+    client.send_file(zip_path, output_file)
 
-    assert output_file.read_text() == "2\n4\n"
+    assert fake_socket.sent_data == b"3+3\n"
+    assert fake_socket.sendfile_calls == 0
 
-def test_extract_zip(tmp_path) -> None:
-    """Check that a .zip archive can be extracted and read correctly."""
+def test_open_zip(tmp_path) -> None:
+    """Check that the text file of a .zip archive can be read correctly."""
     txt = tmp_path / "ops.txt"
     txt.write_text("3+3\n")
 
@@ -81,12 +117,13 @@ def test_extract_zip(tmp_path) -> None:
         zf.write(txt, arcname="ops.txt")
 
     client = ArithmeticClient()
-    content = client._extract_archive(zip_path)
+    with client._open_archive(zip_path) as member:
+        content = member.read()
 
-    assert content == "3+3\n"
+    assert content == b"3+3\n"
 
-def test_extract_tar_xz(tmp_path) -> None:
-    """Check that a .tar.xz archive can be extracted and read correctly."""
+def test_open_tar_xz(tmp_path) -> None:
+    """Check that the text file of a .tar.xz archive can be read correctly."""
     txt = tmp_path / "ops.txt"
     txt.write_text("4*4\n")
 
@@ -95,12 +132,34 @@ def test_extract_tar_xz(tmp_path) -> None:
         tf.add(txt, arcname="ops.txt")
 
     client = ArithmeticClient()
-    content = client._extract_archive(tar_path)
+    with client._open_archive(tar_path) as member:
+        content = member.read()
 
-    assert content == "4*4\n"
+    assert content == b"4*4\n"
 
-def test_extract_7z(tmp_path) -> None:
-    """Check that a .7z archive can be extracted and read correctly."""
+def test_open_tar_xz_first_txt_file(tmp_path) -> None:
+    """Check that the first .txt file of a .tar.xz archive is read, skipping other members."""
+    data = tmp_path / "data.bin"
+    data.write_bytes(b"\x00\x01")
+    first = tmp_path / "first.txt"
+    first.write_text("6/3\n")
+    second = tmp_path / "second.txt"
+    second.write_text("7+7\n")
+
+    tar_path = tmp_path / "ops.tar.xz"
+    with tarfile.open(tar_path, "w:xz") as tf:
+        tf.add(data, arcname="data.bin")
+        tf.add(first, arcname="first.txt")
+        tf.add(second, arcname="second.txt")
+
+    client = ArithmeticClient()
+    with client._open_archive(tar_path) as member:
+        content = member.read()
+
+    assert content == b"6/3\n"
+
+def test_open_7z(tmp_path) -> None:
+    """Check that the text file of a .7z archive can be read correctly."""
     txt = tmp_path / "ops.txt"
     txt.write_text("5-2\n")
 
@@ -109,12 +168,13 @@ def test_extract_7z(tmp_path) -> None:
         archive.write(txt, arcname="ops.txt")
 
     client = ArithmeticClient()
-    content = client._extract_archive(archive_path)
+    with client._open_archive(archive_path) as member:
+        content = member.read()
 
-    assert content == "5-2\n"
+    assert content == b"5-2\n"
 
-def test_extract_archive_no_txt(tmp_path) -> None:
-    """Verify that extraction fails if no .txt file exists in the archive."""
+def test_open_archive_no_txt(tmp_path) -> None:
+    """Verify that opening fails if no .txt file exists in the archive."""
     zip_path = tmp_path / "empty.zip"
     with zipfile.ZipFile(zip_path, "w") as zf:
         zf.writestr("data.bin", b"\x00\x01")
@@ -122,9 +182,10 @@ def test_extract_archive_no_txt(tmp_path) -> None:
     client = ArithmeticClient()
 
     with pytest.raises(ValueError):
-        client._extract_archive(zip_path)
+        with client._open_archive(zip_path):
+            pass
 
-def test_extract_unsupported_format(tmp_path) -> None:
+def test_open_unsupported_format(tmp_path) -> None:
     """Ensure unsupported archive formats raise a ValueError."""
     file_path = tmp_path / "ops.rar"
     file_path.write_text("1+1")
@@ -132,4 +193,5 @@ def test_extract_unsupported_format(tmp_path) -> None:
     client = ArithmeticClient()
 
     with pytest.raises(ValueError):
-        client._extract_archive(file_path)
+        with client._open_archive(file_path):
+            pass
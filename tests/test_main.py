@@ -0,0 +1,73 @@
+"""Test the CLI helpers."""
+from multiprocessing import Event, Process
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+from arithmetic_client_server.main import parse_args, wait_for_server
+
+
+def _exit_before_listening(ready) -> None:
+    """Server process target failing before it listens."""
+    raise SystemExit(1)
+
+
+def _listen(ready) -> None:
+    """Server process target signalling that it listens, then serving for a while."""
+    ready.set()
+    time.sleep(5)
+
+
+def test_wait_for_server_returns_once_server_listens() -> None:
+    """wait_for_server returns as soon as the server is listening."""
+    ready = Event()
+    server_process = Process(target=_listen, args=(ready,))
+    server_process.start()
+    try:
+        wait_for_server(server_process, ready, timeout=5)
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+
+def test_wait_for_server_fails_when_server_exits_before_listening() -> None:
+    """wait_for_server fails at once, without waiting for the timeout, when the server process exits."""
+    ready = Event()
+    server_process = Process(target=_exit_before_listening, args=(ready,))
+    server_process.start()
+
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        wait_for_server(server_process, ready, timeout=10)
+    assert time.monotonic() - start < 5
+    server_process.join()
+
+
+def test_wait_for_server_times_out() -> None:
+    """wait_for_server fails when the server does not listen within the timeout."""
+    ready = Event()
+    server_process = Process(target=time.sleep, args=(5,))
+    server_process.start()
+    try:
+        with pytest.raises(RuntimeError, match="did not start listening"):
+            wait_for_server(server_process, ready, timeout=0.2)
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        ([], False),
+        (["--pin-workers"], True),
+    ],
+)
+def test_parse_args_pin_workers(tmp_path: Path, monkeypatch, options, expected: bool) -> None:
+    """parse_args only enables worker pinning with --pin-workers."""
+    input_file = tmp_path / "operations.txt"
+    input_file.write_text("2 + 3\n")
+    monkeypatch.setattr(sys, "argv", ["sekoia", *options, str(input_file)])
+    assert parse_args().pin_workers is expected
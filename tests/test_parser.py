@@ -12,18 +12,6 @@ def test_tokenize_basic():
     assert tokens == ["3", "+", "4", "*", "2"]
 
 
-@pytest.mark.parametrize("token,expected", [
-    ("123", True),
-    ("45.67", True),
-    ("-8.9", True),
-    ("abc", False),
-    ("+", False),
-])
-def test_is_number_true(token, expected):
-    """_is_number correctly identifies numbers."""
-    assert ExpressionParser._is_number(token) == expected
-
-
 def test_to_rpn_basic():
     """to_rpn converts tokens to correct Reverse Polish Notation."""
     tokens = ["3", "+", "4", "*", "2"]
@@ -52,6 +40,8 @@ def test_evaluate_valid(expr, expected):
     "3 *",        # Single number with trailing operator
     "3 4 + 5",    # Extra operand remaining
     "",           # Empty expression
+    "2 + abc",    # Non-numeric operand
+    "Misery",     # Text line
 ])
 def test_evaluate_invalid_expression(expr):
     """Evaluate raises ValueError for malformed expressions."""
@@ -69,3 +59,36 @@ def test_to_rpn_various(expr, expected):
     tokens = ExpressionParser.tokenize(expr)
     rpn = ExpressionParser.to_rpn(tokens)
     assert rpn == expected
+
+
+def test_evaluate_caches_results():
+    """Evaluate caches results on tokens, so whitespace variations of an expression hit the cache."""
+    ExpressionParser._evaluate_tokens.cache_clear()
+    assert ExpressionParser.evaluate("12 + 30 / 3") == 22.0
+    assert ExpressionParser.evaluate("12  +  30 /   3") == 22.0
+
+    cache_info = ExpressionParser._evaluate_tokens.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 1
+
+
+@pytest.mark.parametrize("expr", [
+    "3 + * 4",    # Consecutive operators
+    "3 * / 4",    # Consecutive operators with higher precedence
+])
+def test_evaluate_not_enough_operands(expr):
+    """Evaluate raises ValueError when an operator lacks an operand."""
+    with pytest.raises(ValueError, match="not enough operands"):
+        ExpressionParser.evaluate(expr)
+
+
+@pytest.mark.parametrize("expr", [
+    "__import__('os').system('true')",
+    "import sys; sys.exit()",
+    "2 ** 10",
+    "(1).__class__",
+])
+def test_evaluate_rejects_python_code(expr):
+    """Evaluate only accepts arithmetic operations, never executes Python code."""
+    with pytest.raises(ValueError):
+        ExpressionParser.evaluate(expr)
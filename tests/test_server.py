@@ -1,11 +1,17 @@
 """Test class ArithmeticServer."""
-from multiprocessing import Pipe, Process
+import multiprocessing
+import os
 from pathlib import Path
+import socket
+import subprocess
+import sys
+import threading
 
+from pydantic import ValidationError
 import pytest
 
+from arithmetic_client_server.server import server as server_module
 from arithmetic_client_server.server.server import ArithmeticServer
-from arithmetic_client_server.server.worker import WorkerProcess
 
 
 @pytest.fixture
@@ -17,18 +23,26 @@ def tmp_output_file(tmp_path: Path) -> Path:
 class FakeSocket:
     """Mock socket to simulate client-server communication."""
 
-    def __init__(self, lines: list[str]):
+    def __init__(self, lines: list[str], max_chunk_size: int | None = None):
         self.data = "\n".join(lines).encode()
         self.sent_data = b""
         self.offset = 0
+        self.max_chunk_size = max_chunk_size
 
     def recv(self, bufsize: int) -> bytes:
         if self.offset >= len(self.data):
             return b""
+        if self.max_chunk_size is not None:
+            bufsize = min(bufsize, self.max_chunk_size)
         chunk = self.data[self.offset : self.offset + bufsize]
         self.offset += bufsize
         return chunk
 
+    def recv_into(self, buffer) -> int:
+        chunk = self.recv(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
     def sendall(self, data: bytes) -> None:
         self.sent_data += data
 
@@ -36,49 +50,221 @@ class FakeSocket:
         pass
 
 
-def test_receive_data(tmp_output_file: Path) -> None:
-    """_receive_data returns non-empty lines from socket."""
+def _free_port() -> int:
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_receive_lines(tmp_output_file: Path) -> None:
+    """_receive_lines yields non-empty lines from socket."""
     lines = ["2 + 3", "", "4 * 5"]
     fake_socket = FakeSocket(lines)
     server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
-    result = server._receive_data(fake_socket)
+    result = list(server._receive_lines(fake_socket))
     assert result == ["2 + 3", "4 * 5"]
 
 
-def test_spawn_worker_returns_process_and_pipe(tmp_output_file: Path) -> None:
-    """_spawn_worker returns a Process and a parent Pipe."""
+def test_receive_lines_multiple_chunks(tmp_output_file: Path) -> None:
+    """_receive_lines reassembles lines split across several chunks."""
+    lines = ["12 + 34", "56 * 78", "9 - 10"]
+    fake_socket = FakeSocket(lines, max_chunk_size=4)
     server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
-    proc, parent_pipe = server._spawn_worker("1 + 1", 1)
-    assert hasattr(proc, "start") and hasattr(proc, "join")
-    assert hasattr(parent_pipe, "send") and hasattr(parent_pipe, "recv")
-    proc.terminate()
-    proc.join()
+    result = list(server._receive_lines(fake_socket))
+    assert result == lines
 
 
-def test_collect_finished_workers_writes_results(tmp_output_file: Path) -> None:
-    """_collect_finished_workers writes results or errors to file."""
+def test_receive_lines_carriage_returns(tmp_output_file: Path) -> None:
+    """_receive_lines splits lines ended by carriage returns only, received across several chunks."""
+    fake_socket = FakeSocket([], max_chunk_size=4)
+    fake_socket.data = b"12 + 34\r56 * 78\r9 - 10"
     server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
+    result = list(server._receive_lines(fake_socket))
+    assert result == ["12 + 34", "56 * 78", "9 - 10"]
 
-    parent_conn, child_conn = Pipe()
-    # simulate worker payload
-    payload = {"line": 1, "expression": "2 + 3", "result": 5.0}
-    child_conn.send(payload)
-    child_conn.close()
 
-    def dummy_run():
-        pass
+def test_receive_lines_before_end_of_data(tmp_output_file: Path) -> None:
+    """_receive_lines yields complete lines before the client has sent all its data."""
+    fake_socket = FakeSocket(["1 + 1", "2 + 2"], max_chunk_size=8)
+    server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
+    lines = server._receive_lines(fake_socket)
+    assert next(lines) == "1 + 1"
+    assert fake_socket.offset == 8
+
+
+@pytest.mark.parametrize("recv_buffer_size", [1 << 9, (1 << 20) + 1])
+def test_recv_buffer_size_bounds(tmp_output_file: Path, recv_buffer_size: int) -> None:
+    """recv_buffer_size must be between 1 KiB and 1 MiB."""
+    with pytest.raises(ValidationError):
+        ArithmeticServer(output_file=tmp_output_file, recv_buffer_size=recv_buffer_size)
+
+
+@pytest.mark.parametrize(
+    "parallel_threshold, nb_cpus",
+    [
+        (2000, 4),  # Below threshold: evaluated in the server process
+        (0, 1),     # Single CPU: evaluated in the server process
+        (0, 2),     # Evaluated in a pool of worker processes
+    ],
+)
+def test_evaluate(tmp_output_file: Path, monkeypatch, parallel_threshold: int, nb_cpus: int) -> None:
+    """_evaluate returns the output lines of each expression, in the server process or in worker processes."""
+    monkeypatch.setattr(server_module, "cpu_count", lambda: nb_cpus)
+    server = ArithmeticServer(output_file=tmp_output_file, parallel_threshold=parallel_threshold)
+
+    lines = b"".join(server._evaluate(iter(["2 + 3", "4 *", "6 / 3"]))).decode().splitlines()
+
+    assert sorted(lines) == [
+        "2 + 3 = 5.0",
+        "4 * -> ERROR: Expression cannot start or end with an operator: 4 *",
+        "6 / 3 = 2.0",
+    ]
+
+
+def test_evaluate_in_server_process_as_received(tmp_output_file: Path, monkeypatch) -> None:
+    """_evaluate yields the first batch in the server process before the rest of the input is received."""
+    monkeypatch.setattr(server_module, "cpu_count", lambda: 1)
+    server = ArithmeticServer(output_file=tmp_output_file, parallel_threshold=0)
+    received = []
+
+    def receive_lines():
+        for i in range(3 * server_module.DISPATCH_BATCH_SIZE):
+            received.append(i)
+            yield f"{i} + 1"
+
+    results = server._evaluate(receive_lines())
+    first_batch = next(results)
+
+    assert first_batch.decode().splitlines()[0] == "0 + 1 = 1.0"
+    assert len(received) == server_module.DISPATCH_BATCH_SIZE
+    assert len(b"".join(results).decode().splitlines()) == 2 * server_module.DISPATCH_BATCH_SIZE
+
+
+@pytest.mark.parametrize(
+    "pin_workers, affinity, expected",
+    [
+        (False, {0, 1}, ()),
+        (True, {3, 1, 2}, (1, 2, 3)),
+    ],
+)
+def test_pinned_cpus(tmp_output_file: Path, monkeypatch, pin_workers: bool, affinity, expected) -> None:
+    """_pinned_cpus returns the CPUs the server may run on, sorted, only when pin_workers is enabled."""
+    monkeypatch.setattr(server_module.os, "sched_getaffinity", lambda pid: affinity, raising=False)
+    monkeypatch.setattr(server_module.os, "sched_setaffinity", lambda pid, cpus: None, raising=False)
+    server = ArithmeticServer(output_file=tmp_output_file, pin_workers=pin_workers)
+    assert server._pinned_cpus() == expected
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="CPU affinity is not supported on this platform")
+def test_evaluate_with_pinned_workers(tmp_output_file: Path, monkeypatch) -> None:
+    """_evaluate returns the same output lines when worker processes are pinned to CPUs."""
+    cpu_id = min(os.sched_getaffinity(0))
+    monkeypatch.setattr(server_module, "cpu_count", lambda: 4)
+    monkeypatch.setattr(ArithmeticServer, "_pinned_cpus", lambda self: (cpu_id, cpu_id))
+    server = ArithmeticServer(output_file=tmp_output_file, parallel_threshold=0, pin_workers=True)
+
+    lines = b"".join(server._evaluate(iter(["2 + 3", "6 / 3"]))).decode().splitlines()
+
+    assert sorted(lines) == ["2 + 3 = 5.0", "6 / 3 = 2.0"]
 
-    proc = Process(target=dummy_run)
-    proc.start()
-    proc.join()
 
-    active_workers = [(proc, parent_conn)]
+@pytest.mark.parametrize(
+    "default_start_method, expected",
+    [
+        ("fork", "fork"),
+        ("spawn", "forkserver"),
+        ("forkserver", "forkserver"),
+    ],
+)
+def test_context(monkeypatch, default_start_method: str, expected: str) -> None:
+    """_context keeps fork when it is the default start method, otherwise uses forkserver."""
+    if expected not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{expected} start method is not supported on this platform")
+    monkeypatch.setattr(server_module, "get_start_method", lambda allow_none=False: default_start_method)
+    server_module._context.cache_clear()
+    try:
+        assert server_module._context().get_start_method() == expected
+    finally:
+        server_module._context.cache_clear()
+
+
+def test_import_keeps_start_method_unset() -> None:
+    """Importing the server does not fix the start method, so the application can still set it."""
+    code = (
+        "import multiprocessing\n"
+        "import arithmetic_client_server.server.server\n"
+        "multiprocessing.set_start_method('spawn', force=False)\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize(
+    "batch_size, expected",
+    [
+        (2, [(1, ["1 + 1", "2 + 2"]), (3, ["3 + 3", "4 + 4"]), (5, ["5 + 5"])]),
+        (5, [(1, ["1 + 1", "2 + 2", "3 + 3", "4 + 4", "5 + 5"])]),
+    ],
+)
+def test_batches(batch_size: int, expected) -> None:
+    """_batches splits expressions into batches of consecutive lines with their first line number."""
+    data = [f"{i} + {i}" for i in range(1, 6)]
+    assert list(ArithmeticServer._batches(data, batch_size)) == expected
+
+
+def test_write_results_writes_and_sends_results_and_errors(tmp_output_file: Path) -> None:
+    """_write_results writes results or errors to file and sends the same bytes to the client."""
+    server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
+    results = [b"2 + 3 = 5.0\n", b"2 + -> ERROR: Invalid\n"]
+    fake_socket = FakeSocket([])
+
+    with tmp_output_file.open("wb") as f_out:
+        server._write_results(results, f_out, fake_socket)
+
+    assert tmp_output_file.read_text().splitlines() == ["2 + 3 = 5.0", "2 + -> ERROR: Invalid"]
+    assert fake_socket.sent_data == tmp_output_file.read_bytes()
 
-    with tmp_output_file.open("w") as f_out:
-        server._collect_finished_workers(active_workers, f_out)
 
-    content = tmp_output_file.read_text()
-    assert "2 + 3 = 5.0" in content
+def test_write_results_writes_by_batches(tmp_output_file: Path, monkeypatch) -> None:
+    """_write_results only writes once a batch is full, then writes the remaining lines."""
+    monkeypatch.setattr(server_module, "WRITE_BATCH_SIZE", 24)
+    server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
+    results = [f"{i} + {i} = {2.0 * i}\n".encode() for i in range(1, 6)]
+
+    class RecordingFile:
+        def __init__(self):
+            self.batches = []
+
+        def write(self, data):
+            self.batches.append(data)
+
+    f_out = RecordingFile()
+    fake_socket = FakeSocket([])
+    server._write_results(results, f_out, fake_socket)
+
+    assert [batch.count(b"\n") for batch in f_out.batches] == [2, 2, 1]
+    assert fake_socket.sent_data == b"".join(f_out.batches)
+
+
+def test_write_results_keeps_writing_when_client_disconnects(tmp_output_file: Path, monkeypatch) -> None:
+    """_write_results still writes all results to file after the client disconnected."""
+    monkeypatch.setattr(server_module, "WRITE_BATCH_SIZE", 1)
+    server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
+    results = [f"{i} + {i} = {2.0 * i}\n".encode() for i in range(1, 4)]
+
+    class DisconnectedSocket(FakeSocket):
+        def sendall(self, data: bytes) -> None:
+            self.calls = getattr(self, "calls", 0) + 1
+            raise BrokenPipeError("Broken pipe")
+
+    disconnected_socket = DisconnectedSocket([])
+    with tmp_output_file.open("wb") as f_out:
+        server._write_results(results, f_out, disconnected_socket)
+
+    assert len(tmp_output_file.read_text().splitlines()) == 3
+    assert disconnected_socket.calls == 1
 
 
 @pytest.mark.parametrize(
@@ -89,54 +275,25 @@ def test_collect_finished_workers_writes_results(tmp_output_file: Path) -> None:
     ],
 )
 def test_server_start(tmp_output_file: Path, lines, expected_output) -> None:
-    """Start processes expressions and writes results for valid/invalid input."""
-    # Patch WorkerProcess.run to simulate evaluation
-    original_run = WorkerProcess.run
-
-    def fake_run(self):
-        try:
-            # Try to evaluate the expression safely
-            result = eval(self.expression)  # safe here because test input is controlled
-            self.conn.send({
-                "line": self.line_number,
-                "expression": self.expression,
-                "result": float(result),
-            })
-        except Exception:
-            self.conn.send({
-                "line": self.line_number,
-                "expression": self.expression,
-                "error": "Invalid",
-            })
-        finally:
-            self.conn.close()
-
-    WorkerProcess.run = fake_run
-
-    # Mock socket
-    fake_socket = FakeSocket(lines)
-
-    server = ArithmeticServer(host="127.0.0.1", port=9000, output_file=tmp_output_file)
-    data = server._receive_data(fake_socket)
-
-    # Spawn workers
-    active_workers = [server._spawn_worker(expr, i + 1) for i, expr in enumerate(data)]
-
-    # Collect results
-    with tmp_output_file.open("w") as f_out:
-        for proc, pipe_conn in active_workers:
-            payload = pipe_conn.recv()
-            pipe_conn.close()
-            proc.join()
-            if "result" in payload:
-                f_out.write(f"{payload['expression']} = {payload['result']}\n")
-            else:
-                f_out.write(f"{payload['expression']} -> ERROR\n")
-            f_out.flush()
+    """Start processes expressions in the worker pool and sends results for valid/invalid input."""
+    port = _free_port()
+    server = ArithmeticServer(port=port, output_file=tmp_output_file)
+    ready = threading.Event()
+    server_thread = threading.Thread(target=server.start, kwargs={"ready": ready})
+    server_thread.start()
+
+    assert ready.wait(timeout=5)
+    client = socket.create_connection(("127.0.0.1", port))
+    with client:
+        client.sendall("\n".join(lines).encode())
+        client.shutdown(socket.SHUT_WR)
+        received = b""
+        while chunk := client.recv(4096):
+            received += chunk
+    server_thread.join(timeout=30)
 
     content = tmp_output_file.read_text().splitlines()
+    assert received.decode().splitlines() == content
+    assert len(content) == len(expected_output)
     for expected in expected_output:
         assert any(expected in line for line in content)
-
-    # Restore original method
-    WorkerProcess.run = original_run
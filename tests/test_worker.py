@@ -1,9 +1,10 @@
-"""Unit tests for WorkerProcess using real Pipe connections."""
-from multiprocessing import Pipe
+"""Unit tests for the worker functions."""
+from multiprocessing import Value
+import os
 
 import pytest
 
-from arithmetic_client_server.server.worker import WorkerProcess
+from arithmetic_client_server.server.worker import evaluate_batch, evaluate_expression, format_result, pin_to_cpu
 
 
 @pytest.mark.parametrize(
@@ -15,17 +16,14 @@ from arithmetic_client_server.server.worker import WorkerProcess
         ("8 / 2", 4.0),
     ],
 )
-def test_worker_sends_result_for_valid_expression(expr: str, expected: float) -> None:
-    """Worker sends computed result through the connection for valid expressions."""
-    parent_conn, child_conn = Pipe()
-    worker = WorkerProcess(conn=child_conn, expression=expr, line_number=1)
-    worker.run()
+def test_worker_returns_result_for_valid_expression(expr: str, expected: float) -> None:
+    """Worker returns the computed result for valid expressions."""
+    payload = evaluate_expression((1, expr))
 
-    msg = parent_conn.recv()
-    assert msg["line"] == 1
-    assert msg["expression"] == expr
-    assert msg["result"] == expected
-    assert "error" not in msg
+    assert payload["line"] == 1
+    assert payload["expression"] == expr
+    assert payload["result"] == expected
+    assert "error" not in payload
 
 
 @pytest.mark.parametrize(
@@ -34,23 +32,62 @@ def test_worker_sends_result_for_valid_expression(expr: str, expected: float) ->
         "2 +",         # Trailing operator
         "+ 3 4",       # Leading operator
         "3 4 + 5",     # Extra operand remaining
+        "",            # Empty expression
     ],
 )
-def test_worker_sends_error_for_invalid_expression(expr: str) -> None:
-    """Worker sends an error message for malformed arithmetic expressions."""
-    parent_conn, child_conn = Pipe()
-    worker = WorkerProcess(conn=child_conn, expression=expr, line_number=2)
-    worker.run()
-
-    msg = parent_conn.recv()
-    assert msg["line"] == 2
-    assert msg["expression"] == expr
-    assert "error" in msg
-    assert isinstance(msg["error"], str)
-
-
-def test_worker_rejects_empty_expression() -> None:
-    """Pydantic validation prevents creating WorkerProcess with empty expression."""
-    _, child_conn = Pipe()
-    with pytest.raises(ValueError):
-        WorkerProcess(conn=child_conn, expression="", line_number=1)
+def test_worker_returns_error_for_invalid_expression(expr: str) -> None:
+    """Worker returns an error message for malformed arithmetic expressions."""
+    payload = evaluate_expression((2, expr))
+
+    assert payload["line"] == 2
+    assert payload["expression"] == expr
+    assert "result" not in payload
+    assert isinstance(payload["error"], str)
+
+
+@pytest.mark.parametrize(
+    "payload,expected",
+    [
+        ({"line": 1, "expression": "2 + 3", "result": 5.0}, "2 + 3 = 5.0\n"),
+        ({"line": 2, "expression": "2 +", "error": "Invalid"}, "2 + -> ERROR: Invalid\n"),
+    ],
+)
+def test_format_result(payload, expected: str) -> None:
+    """Results and errors are formatted as output lines."""
+    assert format_result(payload) == expected
+
+
+def test_evaluate_batch_returns_encoded_output_lines() -> None:
+    """Worker evaluates a batch of expressions and returns their output lines in order, encoded."""
+    output = evaluate_batch((3, ["2 + 3", "2 +", "8 / 2"]))
+
+    assert isinstance(output, bytes)
+    assert output.decode().splitlines() == [
+        "2 + 3 = 5.0",
+        "2 + -> ERROR: Expression cannot start or end with an operator: 2 +",
+        "8 / 2 = 4.0",
+    ]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="CPU affinity is not supported on this platform")
+def test_pin_to_cpu() -> None:
+    """Worker pins itself to the next unused CPU."""
+    affinity = os.sched_getaffinity(0)
+    cpu_id = max(affinity)
+    next_index = Value("i", 0)
+    try:
+        pin_to_cpu((cpu_id,), next_index)
+        assert os.sched_getaffinity(0) == {cpu_id}
+        assert next_index.value == 1
+    finally:
+        os.sched_setaffinity(0, affinity)
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="CPU affinity is not supported on this platform")
+def test_pin_to_cpu_once_all_cpus_are_taken() -> None:
+    """Worker started once all CPUs are taken is not pinned, and does not wait for a CPU."""
+    affinity = os.sched_getaffinity(0)
+    next_index = Value("i", 1)
+    pin_to_cpu((max(affinity),), next_index)
+    assert os.sched_getaffinity(0) == affinity
+    assert next_index.value == 2